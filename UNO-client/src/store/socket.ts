@@ -6,6 +6,11 @@ import { RoomInfo } from "~/types/room";
 
 export const eventBus = new EventEmitter()
 
+// 玩家 id 按标签页保存，同一浏览器的多个标签页可作为不同玩家加入房间
+const userId = useSessionStorage('uno-user-id', Date.now().toString())
+// 服务端首次注册昵称时下发的密钥，再次使用该昵称时需要携带
+const userSecrets = useLocalStorage<Record<string, string>>('uno-user-secrets', {})
+
 const useSocketStore = defineStore('socket', {
   state: () => {
     return {
@@ -22,11 +27,17 @@ const useSocketStore = defineStore('socket', {
       this.socket.send(JSON.stringify({
         type: 'CREATE_USER',
         data: {
-          id: Date.now().toString(),
+          id: userId.value,
           name,
+          secret: userSecrets.value[name],
         }
       }))
-      return this.Promisify<UserInfo>('RES_CREATE_USER')
+      return this.Promisify<(UserInfo & { secret: string }) | null>('RES_CREATE_USER').then((user) => {
+        if (user) {
+          userSecrets.value = { ...userSecrets.value, [user.name]: user.secret }
+        }
+        return user
+      })
     },
     createRoom(name: string, owner: UserInfo) {
       this.socket.send(JSON.stringify({
@@ -0,0 +1,142 @@
+import random
+import tracemalloc
+
+import pytest
+
+import server
+from fake_transport import FakeWebSocket
+
+SEED = 20240601
+ROOM_SIZES = [2, 8, 50]
+ROUNDS = 200
+
+
+def make_room(num_players):
+    sockets = [FakeWebSocket(f'p{i}') for i in range(num_players)]
+    users = [{'id': f'u{i}', 'name': f'player{i}'} for i in range(num_players)]
+    code = server.random_code()
+    room = server.Room(users[0], sockets[0], code)
+    for user, ws in zip(users[1:], sockets[1:]):
+        room.players.append(server.Player(user, ws))
+    server.room_collection[code] = room
+    return room, sockets
+
+
+def make_started_room(loop, num_players):
+    room, sockets = make_room(num_players)
+    loop.run_until_complete(server.handle_event('START_GAME', room.roomCode, sockets[0], server.clients))
+    for ws in sockets:
+        ws.clear()
+    return room, sockets
+
+
+# 排除 tracemalloc 自身（快照对象等）的内存
+TRACE_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__)]
+
+
+async def noop(*args):
+    pass
+
+
+def trace_memory(loop, target, args):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS)
+    tracemalloc.reset_peak()
+    start, _ = tracemalloc.get_traced_memory()
+    loop.run_until_complete(target(*args))
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS)
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    return {
+        'retained_blocks': sum(s.count_diff for s in stats if s.count_diff > 0),
+        'retained_bytes': sum(s.size_diff for s in stats if s.size_diff > 0),
+        'peak_bytes': peak - start,
+    }
+
+
+# 单次调用后仍被持有的内存及调用期间的内存峰值，扣除空协程在事件循环上的开销
+def measure_allocations(loop, setup, target):
+    args = setup()
+    baseline = trace_memory(loop, noop, args)
+    result = trace_memory(loop, target, args)
+    return {key: max(0, value - baseline[key]) for key, value in result.items()}
+
+
+def run(benchmark, loop, setup, target):
+    def seeded_setup():
+        server.room_collection.clear()
+        random.seed(SEED)
+        return setup(), {}
+
+    benchmark.extra_info.update(measure_allocations(loop, lambda: seeded_setup()[0], target))
+    benchmark.pedantic(
+        lambda *args: loop.run_until_complete(target(*args)),
+        setup=seeded_setup,
+        rounds=ROUNDS,
+        iterations=1,
+    )
+
+
+@pytest.mark.parametrize('num_players', ROOM_SIZES)
+def test_start_game(benchmark, loop, num_players):
+    def setup():
+        room, sockets = make_room(num_players)
+        return room, sockets
+
+    async def target(room, sockets):
+        await server.handle_event('START_GAME', room.roomCode, sockets[0], server.clients)
+
+    run(benchmark, loop, setup, target)
+    assert server.room_collection
+    room = next(iter(server.room_collection.values()))
+    assert room.status == 'GAMING'
+    assert all(len(p.cards) == 7 for p in room.players)
+
+
+@pytest.mark.parametrize('num_players', ROOM_SIZES)
+def test_out_of_the_card(benchmark, loop, num_players):
+    def setup():
+        room, sockets = make_started_room(loop, num_players)
+        player = room.players[room.order]
+        # 保证首张牌可出，且出牌后手牌多于一张，不触发 UNO 罚牌或结束游戏
+        player.cards[0] = {'color': room.lastCard['color'], 'value': 5}
+        return room, sockets[room.order]
+
+    async def target(room, ws):
+        await server.handle_event('OUT_OF_THE_CARD', {'roomCode': room.roomCode, 'cardsIndex': [0]}, ws, server.clients)
+
+    run(benchmark, loop, setup, target)
+    room = next(iter(server.room_collection.values()))
+    assert room.lastCard['value'] == 5
+    assert room.order == 1
+
+
+@pytest.mark.parametrize('num_players', ROOM_SIZES)
+def test_get_one_card(benchmark, loop, num_players):
+    def setup():
+        room, sockets = make_started_room(loop, num_players)
+        return room, sockets[room.order]
+
+    async def target(room, ws):
+        await server.handle_event('GET_ONE_CARD', room.roomCode, ws, server.clients)
+
+    run(benchmark, loop, setup, target)
+    room = next(iter(server.room_collection.values()))
+    assert len(room.players[room.order].cards) == 8
+
+
+@pytest.mark.parametrize('num_players', ROOM_SIZES)
+def test_submit_color(benchmark, loop, num_players):
+    def setup():
+        room, sockets = make_started_room(loop, num_players)
+        room.lastCard = {'color': 'black', 'value': 'wild'}
+        return room, sockets[room.order]
+
+    async def target(room, ws):
+        await server.handle_event('SUBMIT_COLOR', {'roomCode': room.roomCode, 'color': 'red'}, ws, server.clients)
+
+    run(benchmark, loop, setup, target)
+    room = next(iter(server.room_collection.values()))
+    assert room.lastCard['color'] == 'red'
+    assert room.order == 1
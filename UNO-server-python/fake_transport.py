@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+
+# 进程内的假 websocket，接口与 websockets 连接对象保持一致（send / 异步迭代 / close），
+# 可以让 handle_event 乃至 handler 整条链路在没有真实 socket 的情况下运行
+class FakeWebSocket:
+    def __init__(self, name=None):
+        self.name = name
+        self.sent = []
+        self.closed = False
+        self._inbox = asyncio.Queue()
+
+    async def send(self, message):
+        if self.closed:
+            raise ConnectionError('fake websocket is closed')
+        self.sent.append(message)
+
+    def feed(self, event_type, data=None):
+        self._inbox.put_nowait(json.dumps({'type': event_type, 'data': data}))
+
+    # 模拟客户端断开：已投递的消息处理完后结束接收循环
+    async def close(self):
+        self._inbox.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self._inbox.get()
+        if message is None:
+            self.closed = True
+            raise StopAsyncIteration
+        return message
+
+    def messages(self, event_type=None):
+        decoded = [json.loads(m) for m in self.sent]
+        if event_type is None:
+            return decoded
+        return [m for m in decoded if m.get('type') == event_type]
+
+    def clear(self):
+        self.sent.clear()
+
+    def __repr__(self):
+        return f'<FakeWebSocket {self.name}>'
@@ -5,8 +5,21 @@ import random
 import string
 from collections import defaultdict
 import time
+import math
+import os
+import sys
+import hmac
+import tracemalloc
+from user_registry import UserRegistry
 
 PORT = 3000
+# 管理端口令，未设置时禁用所有管理事件
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+# 用户数据库路径及内存中缓存的用户数量
+USER_DB_PATH = os.environ.get('USER_DB_PATH', 'users.db')
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+# 昵称保留时长（秒），超过该时长未登录的昵称可被他人使用
+USER_TTL = int(os.environ.get('USER_TTL', 7 * 24 * 3600))
 
 # 事件列表
 EVENTS = [
@@ -23,6 +36,14 @@ EVENTS = [
     'UNO'
 ]
 
+# 管理事件列表（需携带 ADMIN_TOKEN）
+ADMIN_EVENTS = [
+    'ADMIN_ROOMS',
+    'ADMIN_MEMORY_SNAPSHOT',
+    'ADMIN_MEMORY_DIFF',
+    'ADMIN_MEMORY_STOP'
+]
+
 # 数据结构
 class Player:
     def __init__(self, user_info, ws):
@@ -90,7 +111,7 @@ class User:
 
 # 全局集合
 room_collection = {}
-user_collection = {}
+user_collection = UserRegistry(USER_DB_PATH, USER_CACHE_SIZE, ttl=USER_TTL)
 
 clients = set()
 controllers = {}
@@ -126,19 +147,18 @@ async def create_room(data, ws, wss):
 
 # CREATE_USER
 async def create_user(data, ws, wss):
-    key = data['id'] + data['name']
-    if key in user_collection:
+    record = await user_collection.create(data)
+    if record is None:
         await send(ws, {
             'type': 'RES_CREATE_USER',
             'data': None,
             'message': '人员已存在，请重新输入昵称'
         })
         return
-    user = User(data)
-    user_collection[key] = user
+    user = User(record)
     await send(ws, {
         'type': 'RES_CREATE_USER',
-        'data': { 'id': user.id, 'name': user.name },
+        'data': { 'id': user.id, 'name': user.name, 'secret': record['secret'] },
         'message': '玩家信息创建成功'
     })
 
@@ -266,7 +286,14 @@ UNO_NUMBERS = list(range(0, 10))
 UNO_ACTIONS = ['skip', 'reverse', 'draw2']
 UNO_WILDS = ['wild', 'wild_draw4']
 
-def generate_uno_deck():
+def generate_uno_deck(decks=1):
+    deck = []
+    for _ in range(decks):
+        deck.extend(_single_uno_deck())
+    random.shuffle(deck)
+    return deck
+
+def _single_uno_deck():
     deck = []
     # 普通牌
     for color in UNO_COLORS:
@@ -281,9 +308,15 @@ def generate_uno_deck():
     for _ in range(4):
         deck.append({'color': 'black', 'value': 'wild'})
         deck.append({'color': 'black', 'value': 'wild_draw4'})
-    random.shuffle(deck)
     return deck
 
+# 一副牌 108 张，人数较多时合并多副牌，保证发完手牌后牌堆至少还剩四分之一副牌
+UNO_DECK_SIZE = 108
+UNO_DECK_RESERVE = UNO_DECK_SIZE // 4
+
+def decks_needed(num_players, cards_per_player=7):
+    return math.ceil((num_players * cards_per_player + UNO_DECK_RESERVE) / UNO_DECK_SIZE)
+
 def deal_cards(deck, num_players, cards_per_player=7):
     hands = []
     for _ in range(num_players):
@@ -311,20 +344,23 @@ async def start_game(data, ws, wss):
         return
     room.status = 'GAMING'
     room.startTime = int(time.time() * 1000)
-    room.gameCards = generate_uno_deck()
+    room.gameCards = generate_uno_deck(decks_needed(len(room.players)))
     hands = deal_cards(room.gameCards, len(room.players))
     for i, player in enumerate(room.players):
         player.cards = hands[i]
         player.uno = False
         player.lastCard = None
         room.userCards[player.id] = player.cards
-    while True:
+    # 翻开第一张非万能牌，最多翻完整个牌堆；全是万能牌时直接使用顶牌
+    for _ in range(len(room.gameCards)):
         first_card = room.gameCards.pop()
         if first_card['color'] != 'black':
             room.lastCard = first_card
             break
         else:
             room.gameCards.insert(0, first_card)
+    else:
+        room.lastCard = room.gameCards.pop()
     room.order = 0
     for i, player in enumerate(room.players):
         await send(player.socket, {
@@ -683,6 +719,178 @@ for event in EVENTS:
             await send(ws, {'type': f'RES_{event}', 'data': None, 'message': f'{event} 暂未实现'})
         controllers[event] = not_impl
 
+# ---------- 管理端：房间与内存统计 ----------
+
+# 估算对象占用的内存（递归统计容器内元素，跳过 socket 与已统计对象）
+def approx_size(obj, seen=None):
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, seen) + approx_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(approx_size(item, seen) for item in obj)
+    elif isinstance(obj, (Player, Room, User)):
+        size += approx_size({k: v for k, v in vars(obj).items() if k not in ('socket', 'socketInstance')}, seen)
+    return size
+
+def get_room_stats(room, now):
+    return {
+        'roomCode': room.roomCode,
+        'status': room.status,
+        'playerCount': len(room.players),
+        'deckSize': len(room.gameCards),
+        'handSizes': { p.id: len(p.cards) for p in room.players },
+        'ageMs': now - room.createTime,
+        'approxBytes': approx_size(room)
+    }
+
+def format_stats(stats, limit):
+    return [{
+        'trace': str(stat.traceback),
+        'size': stat.size,
+        'count': stat.count,
+        'sizeDiff': getattr(stat, 'size_diff', None),
+        'countDiff': getattr(stat, 'count_diff', None)
+    } for stat in stats[:limit]]
+
+# 最近一次 tracemalloc 快照，作为 ADMIN_MEMORY_DIFF 的基线
+memory_snapshot = None
+# 串行执行 tracemalloc 相关的管理事件，避免快照进行中被 ADMIN_MEMORY_STOP 关闭
+memory_lock = None
+
+ADMIN_STATS_LIMIT = 10
+ADMIN_STATS_MAX_LIMIT = 100
+
+def is_admin(data):
+    if not ADMIN_TOKEN or not isinstance(data, dict):
+        return False
+    token = data.get('token')
+    return isinstance(token, str) and hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+def parse_int(value, default, low, high):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = default
+    return min(max(value, low), high)
+
+def parse_limit(data):
+    return parse_int(data.get('limit', ADMIN_STATS_LIMIT), ADMIN_STATS_LIMIT, 1, ADMIN_STATS_MAX_LIMIT)
+
+def with_memory_lock(fn):
+    async def wrapper(data, ws, wss):
+        global memory_lock
+        if memory_lock is None:
+            memory_lock = asyncio.Lock()
+        async with memory_lock:
+            await fn(data, ws, wss)
+    return wrapper
+
+async def run_in_thread(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+# ADMIN_ROOMS 分页统计（offset/limit，或用 roomCode 指定单个房间），
+# 每统计完一个房间让出事件循环，避免长时间阻塞游戏
+async def admin_rooms(data, ws, wss):
+    now = int(time.time() * 1000)
+    room_code = data.get('roomCode')
+    if room_code is not None:
+        page = [room_collection[room_code]] if isinstance(room_code, str) and room_code in room_collection else []
+        offset = 0
+    else:
+        offset = parse_int(data.get('offset', 0), 0, 0, len(room_collection))
+        page = list(room_collection.values())[offset:offset + parse_limit(data)]
+    rooms = []
+    for room in page:
+        rooms.append(get_room_stats(room, now))
+        await asyncio.sleep(0)
+    await send(ws, {
+        'type': 'RES_ADMIN_ROOMS',
+        'data': {
+            'rooms': rooms,
+            'offset': offset,
+            'roomCount': len(room_collection),
+            'userCount': await user_collection.count(),
+            'userRegistry': user_collection.stats(),
+            'clientCount': len(clients),
+            'roomsApproxBytes': sum(r['approxBytes'] for r in rooms),
+            'usersApproxBytes': user_collection.approx_bytes()
+        },
+        'message': '房间统计'
+    })
+
+# ADMIN_MEMORY_SNAPSHOT 首次调用时开启 tracemalloc
+async def admin_memory_snapshot(data, ws, wss):
+    global memory_snapshot
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    memory_snapshot = await run_in_thread(tracemalloc.take_snapshot)
+    stats = await run_in_thread(memory_snapshot.statistics, 'lineno')
+    current, peak = tracemalloc.get_traced_memory()
+    await send(ws, {
+        'type': 'RES_ADMIN_MEMORY_SNAPSHOT',
+        'data': {
+            'current': current,
+            'peak': peak,
+            'top': format_stats(stats, parse_limit(data))
+        },
+        'message': '内存快照已保存'
+    })
+
+# ADMIN_MEMORY_DIFF 与上一次快照对比，并以当前快照作为新基线
+async def admin_memory_diff(data, ws, wss):
+    global memory_snapshot
+    if memory_snapshot is None or not tracemalloc.is_tracing():
+        await send(ws, {
+            'type': 'RES_ADMIN_MEMORY_DIFF',
+            'data': None,
+            'message': '请先调用 ADMIN_MEMORY_SNAPSHOT'
+        })
+        return
+    snapshot = await run_in_thread(tracemalloc.take_snapshot)
+    stats = await run_in_thread(snapshot.compare_to, memory_snapshot, 'lineno')
+    memory_snapshot = snapshot
+    await send(ws, {
+        'type': 'RES_ADMIN_MEMORY_DIFF',
+        'data': {
+            'top': format_stats(stats, parse_limit(data))
+        },
+        'message': '内存快照对比'
+    })
+
+# ADMIN_MEMORY_STOP 关闭 tracemalloc，释放快照
+async def admin_memory_stop(data, ws, wss):
+    global memory_snapshot
+    memory_snapshot = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    await send(ws, {
+        'type': 'RES_ADMIN_MEMORY_STOP',
+        'data': None,
+        'message': '内存追踪已关闭'
+    })
+
+def require_admin(event, fn):
+    async def wrapper(data, ws, wss):
+        if not is_admin(data):
+            await send(ws, {'type': f'RES_{event}', 'data': None, 'message': '无权限'})
+            return
+        await fn(data, ws, wss)
+    return wrapper
+
+admin_controllers = {
+    'ADMIN_ROOMS': admin_rooms,
+    'ADMIN_MEMORY_SNAPSHOT': with_memory_lock(admin_memory_snapshot),
+    'ADMIN_MEMORY_DIFF': with_memory_lock(admin_memory_diff),
+    'ADMIN_MEMORY_STOP': with_memory_lock(admin_memory_stop)
+}
+for event in ADMIN_EVENTS:
+    controllers[event] = require_admin(event, admin_controllers[event])
+
 async def handler(websocket, path):
     clients.add(websocket)
     try:
@@ -703,9 +911,13 @@ async def handler(websocket, path):
         clients.remove(websocket)
 
 async def main():
-    async with websockets.serve(handler, '0.0.0.0', PORT):
-        print(f'Server started on ws://0.0.0.0:{PORT}')
-        await asyncio.Future()  # run forever
+    await user_collection.open()
+    try:
+        async with websockets.serve(handler, '0.0.0.0', PORT):
+            print(f'Server started on ws://0.0.0.0:{PORT}')
+            await asyncio.Future()  # run forever
+    finally:
+        await user_collection.close()
 
 if __name__ == '__main__':
     asyncio.run(main()) 
\ No newline at end of file
@@ -0,0 +1,26 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['USER_DB_PATH'] = ':memory:'
+
+import server  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    server.room_collection.clear()
+    server.clients.clear()
+    yield
+    server.room_collection.clear()
+    server.clients.clear()
@@ -0,0 +1,113 @@
+import asyncio
+import tracemalloc
+
+import pytest
+
+import server
+from fake_transport import FakeWebSocket
+
+TOKEN = 'sécret'
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(server, 'ADMIN_TOKEN', TOKEN)
+    yield TOKEN
+    server.memory_snapshot = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def emit(loop, ws, event_type, data):
+    loop.run_until_complete(server.handle_event(event_type, data, ws, server.clients))
+    return ws.messages()[-1]
+
+
+@pytest.mark.parametrize('configured, token', [
+    (None, 'anything'),
+    (TOKEN, 'wrong'),
+    (TOKEN, 'é'),
+    (TOKEN, None),
+])
+def test_admin_rejects_bad_token(loop, monkeypatch, configured, token):
+    monkeypatch.setattr(server, 'ADMIN_TOKEN', configured)
+    ws = FakeWebSocket()
+    for event in server.ADMIN_EVENTS:
+        message = emit(loop, ws, event, {'token': token})
+        assert message == {'type': f'RES_{event}', 'data': None, 'message': '无权限'}
+
+
+def test_admin_rooms(loop, admin_token):
+    sockets = [FakeWebSocket(i) for i in range(3)]
+    room = server.Room({'id': 'u0', 'name': 'player0'}, sockets[0], 'ROOM01')
+    room.players.append(server.Player({'id': 'u1', 'name': 'player1'}, sockets[1]))
+    server.room_collection[room.roomCode] = room
+    loop.run_until_complete(server.handle_event('START_GAME', room.roomCode, sockets[0], server.clients))
+
+    message = emit(loop, sockets[2], 'ADMIN_ROOMS', {'token': admin_token})
+    assert message['type'] == 'RES_ADMIN_ROOMS'
+    data = message['data']
+    assert data['roomCount'] == 1
+    assert data['offset'] == 0
+    assert set(data) >= {'userCount', 'clientCount', 'roomsApproxBytes', 'usersApproxBytes'}
+    stats = data['rooms'][0]
+    assert stats['roomCode'] == 'ROOM01'
+    assert stats['status'] == 'GAMING'
+    assert stats['playerCount'] == 2
+    assert stats['handSizes'] == {'u0': 7, 'u1': 7}
+    assert stats['deckSize'] == len(room.gameCards)
+    assert stats['ageMs'] >= 0
+    assert stats['approxBytes'] > 0
+
+
+def test_admin_memory_lifecycle(loop, admin_token):
+    ws = FakeWebSocket()
+    message = emit(loop, ws, 'ADMIN_MEMORY_DIFF', {'token': admin_token})
+    assert message['data'] is None
+
+    message = emit(loop, ws, 'ADMIN_MEMORY_SNAPSHOT', {'token': admin_token, 'limit': '3'})
+    assert tracemalloc.is_tracing()
+    assert len(message['data']['top']) <= 3
+
+    message = emit(loop, ws, 'ADMIN_MEMORY_DIFF', {'token': admin_token, 'limit': -5})
+    assert len(message['data']['top']) == 1
+
+    message = emit(loop, ws, 'ADMIN_MEMORY_STOP', {'token': admin_token})
+    assert message['type'] == 'RES_ADMIN_MEMORY_STOP'
+    assert not tracemalloc.is_tracing()
+
+    message = emit(loop, ws, 'ADMIN_MEMORY_DIFF', {'token': admin_token})
+    assert message['data'] is None
+
+
+def test_admin_memory_stop_waits_for_snapshot(loop, admin_token):
+    ws = FakeWebSocket()
+
+    async def race():
+        await asyncio.gather(
+            server.handle_event('ADMIN_MEMORY_SNAPSHOT', {'token': admin_token}, ws, server.clients),
+            server.handle_event('ADMIN_MEMORY_STOP', {'token': admin_token}, ws, server.clients),
+        )
+
+    loop.run_until_complete(race())
+    assert [m['type'] for m in ws.messages()] == ['RES_ADMIN_MEMORY_SNAPSHOT', 'RES_ADMIN_MEMORY_STOP']
+    assert not tracemalloc.is_tracing()
+
+
+def test_admin_rooms_pagination(loop, admin_token):
+    ws = FakeWebSocket()
+    for i in range(5):
+        server.room_collection[f'ROOM0{i}'] = server.Room({'id': f'u{i}', 'name': f'player{i}'}, FakeWebSocket(i), f'ROOM0{i}')
+
+    data = emit(loop, ws, 'ADMIN_ROOMS', {'token': admin_token, 'offset': 1, 'limit': 2})['data']
+    assert [r['roomCode'] for r in data['rooms']] == ['ROOM01', 'ROOM02']
+    assert data['roomCount'] == 5
+
+    data = emit(loop, ws, 'ADMIN_ROOMS', {'token': admin_token, 'offset': 'x', 'limit': 0})['data']
+    assert [r['roomCode'] for r in data['rooms']] == ['ROOM00']
+
+    data = emit(loop, ws, 'ADMIN_ROOMS', {'token': admin_token, 'roomCode': 'ROOM03'})['data']
+    assert [r['roomCode'] for r in data['rooms']] == ['ROOM03']
+
+    data = emit(loop, ws, 'ADMIN_ROOMS', {'token': admin_token, 'roomCode': 'NOPE'})['data']
+    assert data['rooms'] == []
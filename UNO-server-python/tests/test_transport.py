@@ -0,0 +1,24 @@
+import server
+from fake_transport import FakeWebSocket
+
+
+def test_handler_receive_loop(loop):
+    ws = FakeWebSocket('owner')
+    ws.feed('CREATE_ROOM', {'id': 'u0', 'name': 'player0'})
+    ws.feed('NO_SUCH_EVENT')
+
+    async def drive():
+        task = loop.create_task(server.handler(ws, '/'))
+        await ws.close()
+        await task
+
+    loop.run_until_complete(drive())
+    messages = ws.messages()
+    assert messages[0] == {'message': '欢迎来到UNO世界！'}
+    assert ws.messages('RES_CREATE_ROOM')[0]['data']['owner']['id'] == 'u0'
+    assert ws.messages('UPDATE_PLAYER_LIST')
+    assert messages[-1]['type'] == 'ERROR'
+    assert len(server.room_collection) == 1
+    assert ws not in server.clients
+    assert ws.closed
+
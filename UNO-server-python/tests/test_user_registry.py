@@ -0,0 +1,126 @@
+import sqlite3
+
+import pytest
+
+import server
+from fake_transport import FakeWebSocket
+from user_registry import BloomFilter, LRUCache, UserRegistry
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'users.db')
+
+
+def open_registry(loop, path, **kwargs):
+    registry = UserRegistry(path, expected_users=1000, **kwargs)
+    loop.run_until_complete(registry.open())
+    return registry
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert list(cache.items) == ['a', 'c']
+    assert len(cache) == 2
+
+
+def test_bloom_has_no_false_negatives():
+    bloom = BloomFilter(1000)
+    names = [f'player{i}' for i in range(1000)]
+    for name in names:
+        bloom.add(name)
+    assert all(name in bloom for name in names)
+
+
+def test_secret_is_required_to_reclaim_name(loop, db_path):
+    registry = open_registry(loop, db_path)
+    first = loop.run_until_complete(registry.create({'id': '1', 'name': 'bob'}))
+    assert first['secret']
+    # id 会随房间信息广播，不能作为凭证
+    assert loop.run_until_complete(registry.create({'id': '1', 'name': 'bob'})) is None
+    assert loop.run_until_complete(registry.create({'id': '2', 'name': 'bob', 'secret': 'guess'})) is None
+    again = loop.run_until_complete(registry.create({'id': '3', 'name': 'bob', 'secret': first['secret']}))
+    assert again == {'id': '3', 'name': 'bob', 'secret': first['secret']}
+    assert loop.run_until_complete(registry.count()) == 1
+    with sqlite3.connect(db_path) as conn:
+        stored = conn.execute('SELECT secret_hash FROM users').fetchone()[0]
+    assert stored != first['secret']
+    loop.run_until_complete(registry.close())
+
+
+def test_create_skips_database_read_for_new_names(loop, db_path, monkeypatch):
+    registry = open_registry(loop, db_path)
+    selected = []
+    select = registry._select
+    monkeypatch.setattr(registry, '_select', lambda name: selected.append(name) or select(name))
+    assert loop.run_until_complete(registry.create({'id': '1', 'name': 'alice'}))
+    assert selected == []
+    loop.run_until_complete(registry.close())
+
+
+def test_expired_name_can_be_reclaimed(loop, db_path):
+    registry = open_registry(loop, db_path, ttl=60)
+    loop.run_until_complete(registry.create({'id': '1', 'name': 'bob'}))
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('UPDATE users SET last_seen = last_seen - 120')
+    registry.cache.items.clear()
+    assert not loop.run_until_complete(registry.is_name_taken('bob'))
+    user = loop.run_until_complete(registry.create({'id': '2', 'name': 'bob'}))
+    assert user['id'] == '2'
+    assert user['secret']
+    loop.run_until_complete(registry.close())
+
+
+def test_losing_insert_race_returns_none(loop, db_path):
+    winner = open_registry(loop, db_path)
+    loser = open_registry(loop, db_path)
+    # loser 的布隆过滤器和缓存中都没有 bob，只能在插入时发现冲突
+    assert not loop.run_until_complete(loser.is_name_taken('bob'))
+    assert loop.run_until_complete(winner.create({'id': '1', 'name': 'bob'}))
+    assert loop.run_until_complete(loser.create({'id': '2', 'name': 'bob'})) is None
+    assert loop.run_until_complete(loser.is_name_taken('bob'))
+    loop.run_until_complete(winner.close())
+    loop.run_until_complete(loser.close())
+
+
+def test_users_survive_reopen(loop, db_path):
+    registry = open_registry(loop, db_path)
+    for i in range(50):
+        loop.run_until_complete(registry.create({'id': str(i), 'name': f'player{i}'}))
+    loop.run_until_complete(registry.close())
+
+    reopened = open_registry(loop, db_path, cache_size=4)
+    assert all(f'player{i}' in reopened.bloom for i in range(50))
+    assert loop.run_until_complete(reopened.get('player7'))['id'] == '7'
+    assert loop.run_until_complete(reopened.is_name_taken('player42'))
+    assert loop.run_until_complete(reopened.get('nobody')) is None
+    assert loop.run_until_complete(reopened.count()) == 50
+    loop.run_until_complete(reopened.close())
+
+
+def test_close_shuts_down_executor(loop, db_path):
+    registry = open_registry(loop, db_path)
+    loop.run_until_complete(registry.close())
+    with pytest.raises(RuntimeError):
+        loop.run_until_complete(registry.count())
+
+
+def test_create_user_event_issues_secret(loop, monkeypatch, db_path):
+    registry = open_registry(loop, db_path)
+    monkeypatch.setattr(server, 'user_collection', registry)
+    ws = FakeWebSocket()
+    loop.run_until_complete(server.handle_event('CREATE_USER', {'id': '1', 'name': 'bob'}, ws, server.clients))
+    secret = ws.messages('RES_CREATE_USER')[0]['data']['secret']
+    for user in [{'id': '2', 'name': 'bob', 'secret': secret}, {'id': '3', 'name': 'bob'}]:
+        loop.run_until_complete(server.handle_event('CREATE_USER', user, ws, server.clients))
+    assert [m['data'] for m in ws.messages('RES_CREATE_USER')] == [
+        {'id': '1', 'name': 'bob', 'secret': secret},
+        {'id': '2', 'name': 'bob', 'secret': secret},
+        None,
+    ]
+    loop.run_until_complete(registry.close())
@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import hmac
+import math
+import secrets
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+# 布隆过滤器：用于快速判断昵称“一定未被使用”，内存大小只取决于预期容量
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+# LRU 缓存：只保留最近访问的 capacity 个用户
+class LRUCache:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.items = OrderedDict()
+
+    def get(self, key):
+        value = self.items.get(key)
+        if value is not None:
+            self.items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        if len(self.items) > self.capacity:
+            self.items.popitem(last=False)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def hash_secret(secret):
+    return hashlib.sha256(secret.encode('utf-8')).hexdigest()
+
+
+# 用户注册表：SQLite 持久化，昵称唯一。首次注册时下发密钥（库中只存哈希），
+# 携带密钥重复注册视为再次登录；超过 ttl 秒未登录的昵称可被其他玩家使用。
+# 查重先经过 LRU 缓存与布隆过滤器，所有数据库操作都在单独的工作线程中串行执行，不阻塞事件循环
+class UserRegistry:
+    def __init__(self, path, cache_size=1024, expected_users=1000000, ttl=7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.cache = LRUCache(cache_size)
+        self.bloom = BloomFilter(expected_users)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='user-registry')
+        self._conn = None
+        self._opened = False
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute('CREATE TABLE IF NOT EXISTS users (name TEXT PRIMARY KEY, id TEXT NOT NULL)')
+            columns = [row[1] for row in self._conn.execute('PRAGMA table_info(users)')]
+            if 'last_seen' not in columns:
+                self._conn.execute('ALTER TABLE users ADD COLUMN last_seen INTEGER NOT NULL DEFAULT 0')
+            if 'secret_hash' not in columns:
+                self._conn.execute('ALTER TABLE users ADD COLUMN secret_hash TEXT')
+            self._conn.commit()
+        return self._conn
+
+    def _load_names(self):
+        for (name,) in self._connect().execute('SELECT name FROM users'):
+            self.bloom.add(name)
+
+    def _select(self, name):
+        row = self._connect().execute('SELECT id, name, last_seen, secret_hash FROM users WHERE name = ?', (name,)).fetchone()
+        return { 'id': row[0], 'name': row[1], 'lastSeen': row[2], 'secretHash': row[3] } if row else None
+
+    # 占用昵称，数据库主键保证唯一：新昵称或已过期的昵称换发密钥，
+    # 密钥匹配时保留原密钥，否则返回 None
+    def _claim(self, user, new_hash):
+        conn = self._connect()
+        with conn:
+            try:
+                conn.execute(
+                    'INSERT INTO users (name, id, last_seen, secret_hash) VALUES (?, ?, ?, ?)',
+                    (user['name'], user['id'], user['lastSeen'], new_hash)
+                )
+                return dict(user, secretHash=new_hash)
+            except sqlite3.IntegrityError:
+                pass
+            if user['secretHash'] is not None:
+                cursor = conn.execute(
+                    'UPDATE users SET id = ?, last_seen = ? WHERE name = ? AND secret_hash = ?',
+                    (user['id'], user['lastSeen'], user['name'], user['secretHash'])
+                )
+                if cursor.rowcount:
+                    return user
+            cursor = conn.execute(
+                'UPDATE users SET id = ?, last_seen = ?, secret_hash = ? WHERE name = ? AND last_seen < ?',
+                (user['id'], user['lastSeen'], new_hash, user['name'], user['lastSeen'] - self.ttl)
+            )
+        return dict(user, secretHash=new_hash) if cursor.rowcount else None
+
+    def _count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _is_active(self, user, now):
+        return user['lastSeen'] >= now - self.ttl
+
+    def _owns(self, user, secret_hash):
+        return secret_hash is not None and user['secretHash'] is not None and hmac.compare_digest(user['secretHash'], secret_hash)
+
+    # 建表并把已有昵称载入布隆过滤器，服务启动时调用一次
+    async def open(self):
+        if not self._opened:
+            await self._run(self._load_names)
+            self._opened = True
+
+    # 关闭数据库连接与工作线程，之后不能再使用该实例
+    async def close(self):
+        await self._run(self._close)
+        self._executor.shutdown()
+        self._opened = False
+
+    async def get(self, name):
+        user = self.cache.get(name)
+        if user is not None:
+            return user
+        if self._opened and name not in self.bloom:
+            return None
+        user = await self._run(self._select, name)
+        if user is not None:
+            self.cache.put(name, user)
+        return user
+
+    async def is_name_taken(self, name):
+        user = await self.get(name)
+        return user is not None and self._is_active(user, int(time.time()))
+
+    # 注册或再次登录，返回 { id, name, secret }；昵称被他人占用且未过期时返回 None。
+    # get() 先查缓存与布隆过滤器，确定被占用时不再写库；最终以 _claim 的写入结果为准
+    async def create(self, user_info):
+        now = int(time.time())
+        secret = user_info.get('secret')
+        secret_hash = hash_secret(secret) if isinstance(secret, str) and secret else None
+        user = { 'id': user_info['id'], 'name': user_info['name'], 'lastSeen': now, 'secretHash': secret_hash }
+        existing = await self.get(user['name'])
+        if existing is not None and self._is_active(existing, now) and not self._owns(existing, secret_hash):
+            return None
+        new_secret = secrets.token_urlsafe(16)
+        claimed = await self._run(self._claim, user, hash_secret(new_secret))
+        if claimed is None:
+            current = await self._run(self._select, user['name'])
+            if current is not None:
+                self.cache.put(user['name'], current)
+            return None
+        self.bloom.add(user['name'])
+        self.cache.put(user['name'], claimed)
+        return {
+            'id': claimed['id'],
+            'name': claimed['name'],
+            'secret': secret if claimed['secretHash'] == secret_hash else new_secret
+        }
+
+    async def count(self):
+        return await self._run(self._count)
+
+    # 估算常驻内存：LRU 缓存中的用户记录加布隆过滤器位数组
+    def approx_bytes(self):
+        size = sys.getsizeof(self.cache.items) + sys.getsizeof(self.bloom.bits)
+        for name, user in self.cache.items.items():
+            size += sys.getsizeof(name) + sys.getsizeof(user)
+            size += sum(sys.getsizeof(value) for value in user.values())
+        return size
+
+    def stats(self):
+        return {
+            'cached': len(self.cache),
+            'cacheCapacity': self.cache.capacity,
+            'bloomBytes': len(self.bloom.bits)
+        }